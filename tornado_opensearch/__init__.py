@@ -1,5 +1,7 @@
 # coding: utf-8
 from tornado_opensearch.resource import *
 from tornado_opensearch.error import *
+from tornado_opensearch.blocking import BlockingOpenSearch
 
-__all__ = ["OpenSearch", "APIError", "AccessRestricted", "InvalidSignature"]
+__all__ = ["OpenSearch", "BlockingOpenSearch", "APIError", "AccessRestricted",
+           "InvalidSignature", "Overloaded", "Unavailable"]
@@ -14,6 +14,7 @@ from tornado.httpclient import AsyncHTTPClient
 
 from tornado_opensearch import error
 from tornado_opensearch import util
+from tornado_opensearch.resolver import is_curl_client, pin_address
 
 
 logger = logging.getLogger("tornado_opensearch")
@@ -123,38 +124,60 @@ class APIRequestor(Signator):
     """ 请求"""
 
     def __init__(self, api_baseurl="", api_key=None, api_secret=None,
-                 api_version=None, client=None, debug=False):
+                 api_version=None, client=None, limiter=None, scheduler=None,
+                 recorder=None, resolver=None, debug=False):
         self.api_baseurl = api_baseurl
         self.api_key = api_key
         self.api_secret = api_secret
         self.api_version = api_version
         self.debug = debug
+        self.limiter = limiter
+        self.scheduler = scheduler
+        self.recorder = recorder
+        self.resolver = resolver
 
         self._client = client or AsyncHTTPClient()
 
     @coroutine
-    def request(self, method, endpoint, params, body=""):
+    def request(self, method, endpoint, params, body="", priority=None):
         """ 发起请求，对结果做预处理后返回 Response 字典。
         """
-        raw_response = yield self.request_raw(method, endpoint, params, body)
+        raw_response = yield self.request_raw(
+            method, endpoint, params, body, priority=priority
+        )
 
         response = self.parse_response(raw_response)
 
         return response
 
     @coroutine
-    def request_raw(self, method, endpoint, params, body=""):
+    def request_raw(self, method, endpoint, params, body="", priority=None):
         """ 返回原始请求。"""
         response = None
         method = method.upper()
 
-        if method == "GET":
-            response = yield self._get(endpoint, params)
-        elif method == "POST":
-            response = yield self._post(endpoint, params, body)
-        else:
+        if method not in ("GET", "POST"):
             raise error.APIError("Bad request method")
 
+        if self.recorder is not None:
+            self.recorder.record(method, endpoint, params, body)
+
+        if self.scheduler is not None:
+            priority = self.scheduler.priority_for(endpoint, priority)
+
+        if self.limiter is not None:
+            yield self.limiter.acquire(endpoint)
+
+        start = time.time()
+        try:
+            if method == "GET":
+                response = yield self._get(endpoint, params, priority)
+            else:
+                response = yield self._post(endpoint, params, body, priority)
+        finally:
+            if self.limiter is not None:
+                self.limiter.release(endpoint, *self._timing(response, start))
+
         return response
 
     def parse_response(self, raw_response):
@@ -165,6 +188,8 @@ class APIRequestor(Signator):
         except Exception as e:
             raise error.APIError("无法解析应答格式") from e
 
+        if code >= 500:
+            raise error.Unavailable("请求失败 status: %s" % code)
         if not (200 <= code < 400):
             raise error.APIError("请求失败 status: %s" % code)
 
@@ -202,19 +227,26 @@ class APIRequestor(Signator):
             request_time
         )
 
+    @staticmethod
+    def _timing(response, start):
+        """ 返回 (耗时, 是否成功)，供并发控制使用"""
+        if response is None:
+            return time.time() - start, False
+        return response.request_time, response.code < 500
+
     @staticmethod
     def _format_error_message(code, message):
         return "code:%s, message:%s" % (code, message)
 
     @coroutine
-    def _get(self, endpoint, params):
+    def _get(self, endpoint, params, priority=None):
         url = self.sign_url(method="GET", endpoint=endpoint, params=params)
         request = tornado.httpclient.HTTPRequest(url=url)
-        response = yield self._client.fetch(request, callback=self.log_request)
+        response = yield self._fetch(request, priority)
         return response
 
     @coroutine
-    def _post(self, endpoint, params, body):
+    def _post(self, endpoint, params, body, priority=None):
         url = self.sign_url(method="POST", endpoint=endpoint, params=params)
 
         self._trace(body)
@@ -225,7 +257,29 @@ class APIRequestor(Signator):
                 "Content-Type": "application/x-www-form-urlencoded",
             }
         )
-        response = yield self._client.fetch(request, callback=self.log_request)
+        response = yield self._fetch(request, priority)
+        return response
+
+    @coroutine
+    def _fetch(self, request, priority=None):
+        if self.resolver is not None and is_curl_client(self._client):
+            # curl 不使用 Tornado 的 resolver，需要把解析结果交给它
+            yield pin_address(request, self.resolver)
+
+        if self.scheduler is not None:
+            yield self.scheduler.acquire(priority)
+        try:
+            # 非 2xx 的状态码交给 parse_response 处理
+            response = yield self._client.fetch(request, raise_error=False)
+        except Exception as e:
+            # 连接失败、超时等没有应答的错误
+            logger.error("599 %s %s", request.url, e)
+            raise error.Unavailable("请求失败: %s" % e) from e
+        finally:
+            if self.scheduler is not None:
+                self.scheduler.release()
+
+        self.log_request(response)
         return response
 
     def sign_url(self, method, endpoint, params=None, public_params=None):
@@ -0,0 +1,194 @@
+# coding: utf-8
+import threading
+import concurrent.futures
+
+from tornado.ioloop import IOLoop
+
+from tornado_opensearch import error
+from tornado_opensearch.resource import OpenSearch
+from tornado_opensearch.resolver import create_client
+
+
+API_METHODS = (
+    "search",
+    "suggest",
+    "upload_data",
+    "list_apps",
+    "get_app",
+    "create_app",
+    "delete_app",
+    "rebuild_index",
+    "get_error_log",
+    "warmup",
+)
+
+
+class BlockingOpenSearch(object):
+    """ 同步客户端，用于 Tornado 之外的脚本或工作线程。
+
+    内部启动一个后台线程运行 IOLoop，所有请求共享该线程上的连接池。
+    可以同时在多个线程中调用。
+    """
+
+    def __init__(self, max_clients=10, **kwargs):
+        self.max_clients = max_clients
+
+        self._io_loop = None
+        self._client = None
+        self._closed = False
+        self._setup_error = None
+
+        # 保护 _closed 及 _futures，保证关闭后不会再向 IOLoop 提交任务
+        self._lock = threading.Lock()
+        self._futures = set()
+
+        ready = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(ready, kwargs.get("resolver")),
+            name="tornado-opensearch", daemon=True
+        )
+        self._thread.start()
+        ready.wait()
+
+        if self._setup_error is not None:
+            self._thread.join()
+            raise self._setup_error
+
+        self._api = OpenSearch(client=self._client, **kwargs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _run(self, ready, resolver=None):
+        io_loop = IOLoop()
+
+        def setup():
+            # 必须在 IOLoop 运行后创建，以绑定到当前线程的 IOLoop
+            try:
+                self._client = create_client(
+                    resolver=resolver,
+                    max_clients=self.max_clients
+                )
+            except Exception as e:
+                self._setup_error = e
+                io_loop.stop()
+            finally:
+                ready.set()
+
+        self._io_loop = io_loop
+        io_loop.add_callback(setup)
+        io_loop.start()
+
+        # IOLoop 已停止，未完成的调用不会再有结果
+        with self._lock:
+            futures, self._futures = self._futures, set()
+        for future in futures:
+            if not future.done():
+                future.set_exception(error.Error("客户端已关闭"))
+
+        if self._client is not None:
+            self._client.close()
+        io_loop.close()
+
+    def close(self):
+        """ 停止后台线程并关闭连接，未完成的调用会抛出 error.Error"""
+        self._check_thread()
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._io_loop.add_callback(self._io_loop.stop)
+        self._thread.join()
+
+    def _check_thread(self):
+        if threading.current_thread() is self._thread:
+            # 在 IOLoop 线程内等待会造成死锁
+            raise error.Error("不能在后台线程中调用同步接口")
+
+    def stats(self):
+        return self._api.stats()
+
+    def make_query_str(self, dct):
+        return self._api.make_query_str(dct)
+
+    def submit(self, name, *args, **kwargs):
+        """ 在后台线程中调用 API，立即返回 concurrent.futures.Future"""
+        if name not in API_METHODS:
+            raise AttributeError(name)
+
+        func = getattr(self._api, name)
+        future = concurrent.futures.Future()
+
+        def copy(f):
+            try:
+                future.set_result(f.result())
+            except Exception as e:
+                future.set_exception(e)
+
+        def callback():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                future.set_exception(e)
+                return
+            self._io_loop.add_future(result, copy)
+
+        def discard(f):
+            with self._lock:
+                self._futures.discard(f)
+
+        with self._lock:
+            if self._closed:
+                raise error.Error("客户端已关闭")
+            self._futures.add(future)
+            self._io_loop.add_callback(callback)
+
+        future.add_done_callback(discard)
+        return future
+
+    def call(self, name, *args, **kwargs):
+        """ 调用 API 并等待结果"""
+        self._check_thread()
+        return self.submit(name, *args, **kwargs).result()
+
+    def map(self, name, *iterables, **kwargs):
+        """ 并发调用 API，按顺序返回结果列表。
+        用法与 Executor.map 相同，kwargs 会传给每一次调用。
+        """
+        self._check_thread()
+        futures = [
+            self.submit(name, *args, **kwargs)
+            for args in zip(*iterables)
+        ]
+        return [f.result() for f in futures]
+
+    def search_many(self, queries, **kwargs):
+        """ 并发执行多个搜索"""
+        return self.map("search", queries, **kwargs)
+
+    def upload_many(self, table_name, batches, app_name=None):
+        """ 并发上传多批数据"""
+        batches = list(batches)
+        return self.map(
+            "upload_data",
+            [table_name] * len(batches), batches,
+            app_name=app_name
+        )
+
+
+def _blocking_method(name):
+    def method(self, *args, **kwargs):
+        return self.call(name, *args, **kwargs)
+
+    method.__name__ = name
+    method.__doc__ = getattr(OpenSearch, name).__doc__
+    return method
+
+
+for _name in API_METHODS:
+    setattr(BlockingOpenSearch, _name, _blocking_method(_name))
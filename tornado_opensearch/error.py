@@ -15,3 +15,12 @@ class AccessRestricted(APIError):
 
 class InvalidSignature(APIError):
     pass
+
+
+class Overloaded(APIError):
+    pass
+
+
+class Unavailable(APIError):
+    """ 连接失败、超时或服务端 5xx，稍后可以重试"""
+    pass
@@ -0,0 +1,93 @@
+# coding: utf-8
+from collections import deque
+
+from tornado.concurrent import Future
+from tornado.gen import coroutine
+
+from tornado_opensearch import error
+
+
+class _Endpoint(object):
+    def __init__(self, limit):
+        self.limit = limit
+        self.in_flight = 0
+        self.waiters = deque()
+
+
+class AdaptiveLimiter(object):
+    """ 按 endpoint 自适应调整并发数（AIMD）。
+
+    请求成功且耗时低于 latency_threshold 时，并发上限每个请求增加 1/limit
+    （约每轮增加 1）；出现 5xx 错误或超时时乘以 backoff。
+    超出上限的请求排队等待，队列长度超过 max_queue 时直接拒绝。
+    """
+
+    def __init__(self, initial_limit=10, min_limit=1, max_limit=100,
+                 latency_threshold=1.0, backoff=0.9, max_queue=None):
+        self.initial_limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_threshold = latency_threshold
+        self.backoff = backoff
+        self.max_queue = max_queue
+
+        self._endpoints = {}
+
+    def _get(self, key):
+        endpoint = self._endpoints.get(key)
+        if endpoint is None:
+            endpoint = self._endpoints[key] = _Endpoint(self.initial_limit)
+        return endpoint
+
+    def limit(self, key):
+        """ 当前并发上限"""
+        return int(self._get(key).limit)
+
+    @coroutine
+    def acquire(self, key):
+        """ 取得一个并发名额"""
+        endpoint = self._get(key)
+
+        if not endpoint.waiters and endpoint.in_flight < int(endpoint.limit):
+            endpoint.in_flight += 1
+            return
+
+        if (self.max_queue is not None and
+                len(endpoint.waiters) >= self.max_queue):
+            raise error.Overloaded(
+                "并发已达上限 endpoint: %s, limit: %d" % (key, endpoint.limit)
+            )
+
+        waiter = Future()
+        endpoint.waiters.append(waiter)
+        yield waiter
+
+    def release(self, key, latency=None, ok=True):
+        """ 归还名额，并根据耗时（秒）及是否成功调整上限"""
+        endpoint = self._get(key)
+        endpoint.in_flight -= 1
+
+        if latency is not None:
+            self._update(endpoint, latency, ok)
+
+        while endpoint.waiters and endpoint.in_flight < int(endpoint.limit):
+            endpoint.in_flight += 1
+            endpoint.waiters.popleft().set_result(None)
+
+    def _update(self, endpoint, latency, ok):
+        if not ok or latency > self.latency_threshold:
+            endpoint.limit = max(self.min_limit, endpoint.limit * self.backoff)
+        else:
+            endpoint.limit = min(self.max_limit,
+                                 endpoint.limit + 1.0 / endpoint.limit)
+
+    def stats(self):
+        """ 各 endpoint 的并发上限、进行中及排队的请求数"""
+        return {
+            key: {
+                "limit": int(endpoint.limit),
+                "in_flight": endpoint.in_flight,
+                "queued": len(endpoint.waiters),
+            }
+            for key, endpoint in self._endpoints.items()
+        }
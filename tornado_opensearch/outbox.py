@@ -0,0 +1,423 @@
+# coding: utf-8
+import os
+import json
+import mmap
+import zlib
+import struct
+import logging
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from tornado import gen
+from tornado.gen import coroutine
+from tornado.concurrent import Future
+from tornado.ioloop import IOLoop
+from tornado.locks import Event, Lock
+
+from tornado_opensearch import error
+
+
+logger = logging.getLogger("tornado_opensearch")
+
+# 记录格式：长度(4) + CRC32(4) + JSON
+_HEADER = struct.Struct(">II")
+
+_SEGMENT_SUFFIX = ".seg"
+_CHECKPOINT = "checkpoint"
+_DEAD_LETTER = "dead_letter.jsonl"
+
+# 与数据本身无关的错误，一直重试
+_RETRY_ERRORS = (
+    error.Unavailable,
+    error.Overloaded,
+    error.InvalidSignature,
+    error.AccessRestricted,
+)
+
+
+def _segment_name(number):
+    return "%08d%s" % (number, _SEGMENT_SUFFIX)
+
+
+def _record_at(buf, offset):
+    """ 读取 offset 处的记录，返回 (payload, 下一条的 offset)。
+    记录不完整或校验失败时返回 None。
+    """
+    if offset + _HEADER.size > len(buf):
+        return None
+
+    length, crc = _HEADER.unpack_from(buf, offset)
+    start = offset + _HEADER.size
+    if not length or start + length > len(buf):
+        return None
+
+    payload = buf[start:start + length]
+    if zlib.crc32(payload) != crc:
+        return None
+    return payload, start + length
+
+
+def _iter_records(buf, offset):
+    """ 从 offset 开始逐条读取完整的记录，返回 (payload, 下一条的 offset)。
+    遇到不完整或校验失败的记录时停止。
+    """
+    while True:
+        record = _record_at(buf, offset)
+        if record is None:
+            return
+        yield record
+        offset = record[1]
+
+
+def _resync(buf, offset):
+    """ 跳过 offset 处损坏的数据，返回下一条完整记录的 offset，
+    之后没有完整的记录时返回 len(buf)。
+    """
+    if offset + _HEADER.size <= len(buf):
+        # 通常只是记录内容损坏，长度仍然正确
+        length, _ = _HEADER.unpack_from(buf, offset)
+        end = offset + _HEADER.size + length
+        if end == len(buf) or (end < len(buf) and _record_at(buf, end)):
+            return end
+
+    for candidate in range(offset + 1, len(buf)):
+        if _record_at(buf, candidate) is not None:
+            return candidate
+    return len(buf)
+
+
+class Outbox(object):
+    """ 持久化的 upload_data 发件箱。
+
+    写入的数据先追加到本地磁盘上的分段日志中，fsync 完成后 put 即返回；
+    后台任务按顺序读取日志，合并为较大的 upload_data 请求推送，
+    每次成功后记录检查点，已推送完毕的分段会被删除。
+    进程重启或 OpenSearch 不可用时，未推送的数据不会丢失。
+
+    多个 put 会合并为一次 fsync（组提交）。fsync_delay 秒内的写入
+    会等待同一次 fsync，以延迟换取吞吐。
+
+    校验失败的记录会被移到 <分段>.<offset>.corrupt 文件中并跳过；
+    被 OpenSearch 连续拒绝超过 max_retries 次的数据会写入
+    dead_letter.jsonl 并跳过，不会阻塞之后的数据。
+    """
+
+    def __init__(self, directory, api, segment_size=64 * 1024 * 1024,
+                 fsync_delay=0, batch_size=1000,
+                 drain_interval=1.0, retry_interval=5.0, max_retries=3):
+        self.directory = directory
+        self.api = api
+        self.segment_size = segment_size
+        self.fsync_delay = fsync_delay
+        self.batch_size = batch_size
+        self.drain_interval = drain_interval
+        self.retry_interval = retry_interval
+        self.max_retries = max_retries
+
+        os.makedirs(directory, exist_ok=True)
+
+        self.checkpoint = self._load_checkpoint()
+
+        segments = self._segments()
+        self._segment = segments[-1] if segments else self.checkpoint[0]
+        self._truncate_torn(self._segment)
+        self._file = self._open_segment(self._segment)
+
+        # 所有磁盘读写都在同一个线程中按顺序执行，不阻塞 IOLoop
+        self._executor = ThreadPoolExecutor(1)
+        self._pending = []
+        self._flushing = False
+
+        self._running = False
+        self._written = Event()
+        self._drain_lock = Lock()
+        # 检查点处的数据连续被拒绝的次数
+        self._rejected = 0
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _segments(self):
+        return sorted(
+            int(name[:-len(_SEGMENT_SUFFIX)])
+            for name in os.listdir(self.directory)
+            if name.endswith(_SEGMENT_SUFFIX)
+        )
+
+    def _open_segment(self, number):
+        f = open(self._path(_segment_name(number)), "ab")
+        self._sync_directory()
+        return f
+
+    def _truncate_torn(self, number):
+        """ 截掉分段末尾不完整的记录（上次写入时进程退出）"""
+        path = self._path(_segment_name(number))
+        if not os.path.exists(path):
+            return
+
+        with open(path, "rb") as f:
+            data = f.read()
+
+        end = 0
+        for _, end in _iter_records(data, 0):
+            pass
+
+        # 之后还有完整的记录说明是数据损坏，由 _read_batch 跳过
+        if end < len(data) and _resync(data, end) == len(data):
+            logger.warning("Outbox 分段末尾有不完整的记录，已截断: %s", path)
+            os.truncate(path, end)
+
+    def _sync_directory(self):
+        fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    @coroutine
+    def put(self, table_name, items, app_name=None):
+        """ 写入待推送的数据，落盘后返回"""
+        payload = json.dumps({
+            "t": table_name,
+            "a": app_name or self.api.app_name,
+            "i": items,
+        }).encode("utf-8")
+        record = _HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+        future = Future()
+        self._pending.append((record, future))
+        if not self._flushing:
+            self._flushing = True
+            IOLoop.current().spawn_callback(self._flush)
+
+        yield future
+
+    @coroutine
+    def _flush(self):
+        try:
+            while self._pending:
+                if self.fsync_delay:
+                    yield gen.sleep(self.fsync_delay)
+
+                pending, self._pending = self._pending, []
+                try:
+                    yield self._executor.submit(
+                        self._write, [record for record, _ in pending]
+                    )
+                except Exception as e:
+                    for _, future in pending:
+                        future.set_exception(e)
+                    continue
+
+                for _, future in pending:
+                    future.set_result(None)
+                self._written.set()
+        finally:
+            self._flushing = False
+
+    def _write(self, records):
+        # 同一批记录写入同一个分段，失败时可以整体回滚
+        data = b"".join(records)
+        size = self._file.tell()
+        if size and size + len(data) > self.segment_size:
+            self._file.close()
+            self._segment += 1
+            self._file = self._open_segment(self._segment)
+            size = 0
+
+        try:
+            self._file.write(data)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except Exception:
+            self._rollback(size)
+            raise
+
+    def _rollback(self, offset):
+        """ 写入失败时截掉本批写入的部分数据"""
+        try:
+            self._file.close()
+        except Exception:
+            # 缓冲区中的数据无法写入，丢弃即可
+            pass
+
+        path = self._path(_segment_name(self._segment))
+        os.truncate(path, offset)
+        self._file = open(path, "ab")
+
+    def _load_checkpoint(self):
+        try:
+            with open(self._path(_CHECKPOINT)) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            segments = self._segments()
+            return (segments[0] if segments else 1), 0
+
+        return data["segment"], data["offset"]
+
+    def _save_checkpoint(self, segment, offset):
+        path = self._path(_CHECKPOINT)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"segment": segment, "offset": offset}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+        self.checkpoint = segment, offset
+
+    def _read_batch(self):
+        """ 从检查点开始读取一批相同 (app_name, table_name) 的记录。
+        返回 (key, items, 新检查点)，没有新数据时返回 None。
+        """
+        segment, offset = self.checkpoint
+        key, items = None, []
+
+        while key is None:
+            path = self._path(_segment_name(segment))
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+
+            if offset >= size:
+                # 当前分段已读完，切换到下一个分段
+                later = [n for n in self._segments() if n > segment]
+                if not later:
+                    break
+                segment, offset = later[0], 0
+                continue
+
+            with open(path, "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                    for payload, end in _iter_records(m, offset):
+                        entry = json.loads(payload.decode("utf-8"))
+                        entry_key = (entry["a"], entry["t"])
+                        if key is not None and entry_key != key:
+                            break
+
+                        key = entry_key
+                        items.extend(entry["i"])
+                        offset = end
+
+                        if len(items) >= self.batch_size:
+                            break
+
+                    if key is None:
+                        # 写入与读取在同一线程中执行，读到的不完整记录
+                        # 只可能是损坏的数据
+                        offset = self._skip_corrupt(segment, m, offset)
+
+        if key is None:
+            if (segment, offset) != self.checkpoint:
+                self._commit((segment, offset))
+            return None
+        return key, items, (segment, offset)
+
+    def _skip_corrupt(self, segment, buf, offset):
+        """ 把损坏的数据移到 .corrupt 文件中，返回下一条记录的 offset"""
+        end = _resync(buf, offset)
+        name = "%s.%d.corrupt" % (_segment_name(segment), offset)
+        with open(self._path(name), "wb") as f:
+            f.write(buf[offset:end])
+            f.flush()
+            os.fsync(f.fileno())
+
+        logger.error(
+            "Outbox 分段 %s 偏移 %d 处有 %d 字节损坏的数据，已移至 %s",
+            _segment_name(segment), offset, end - offset, name
+        )
+        return end
+
+    def _dead_letter(self, key, items, exc):
+        app_name, table_name = key
+        line = json.dumps({
+            "t": table_name,
+            "a": app_name,
+            "i": items,
+            "error": str(exc),
+        })
+        with open(self._path(_DEAD_LETTER), "a") as f:
+            f.write(line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    @coroutine
+    def drain(self):
+        """ 推送一批数据，返回推送的文档数"""
+        with (yield self._drain_lock.acquire()):
+            batch = yield self._executor.submit(self._read_batch)
+            if batch is None:
+                return 0
+
+            key, items, checkpoint = batch
+            app_name, table_name = key
+            try:
+                yield self.api.upload_data(
+                    table_name, items, app_name=app_name
+                )
+            except _RETRY_ERRORS:
+                raise
+            except error.APIError as e:
+                self._rejected += 1
+                if self._rejected <= self.max_retries:
+                    raise
+
+                logger.error(
+                    "Outbox 数据被拒绝 %d 次，已移至 %s: %s",
+                    self._rejected, _DEAD_LETTER, e
+                )
+                yield self._executor.submit(
+                    self._dead_letter, key, items, e
+                )
+                items = []
+
+            self._rejected = 0
+            yield self._executor.submit(self._commit, checkpoint)
+            return len(items)
+
+    def _commit(self, checkpoint):
+        self._save_checkpoint(*checkpoint)
+        self._compact()
+
+    def _compact(self):
+        """ 删除已推送完毕的分段"""
+        segment = self.checkpoint[0]
+        for number in self._segments():
+            if number < segment and number != self._segment:
+                os.remove(self._path(_segment_name(number)))
+
+    def start(self):
+        """ 启动后台推送"""
+        if self._running:
+            return
+        self._running = True
+        IOLoop.current().spawn_callback(self._drain_loop)
+
+    def stop(self):
+        self._running = False
+        self._written.set()
+
+    @coroutine
+    def _drain_loop(self):
+        while self._running:
+            self._written.clear()
+            try:
+                count = yield self.drain()
+            except Exception:
+                logger.exception("Outbox 推送失败")
+                yield gen.sleep(self.retry_interval)
+                continue
+
+            if count:
+                continue
+
+            try:
+                yield self._written.wait(
+                    timeout=timedelta(seconds=self.drain_interval)
+                )
+            except gen.TimeoutError:
+                pass
+
+    def close(self):
+        """ 停止后台推送并关闭文件"""
+        self.stop()
+        self._executor.shutdown()
+        self._file.close()
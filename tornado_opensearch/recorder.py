@@ -0,0 +1,53 @@
+# coding: utf-8
+import json
+import time
+
+
+# 签名及公共参数，不写入记录
+SECRET_PARAMS = frozenset([
+    "AccessKeyId",
+    "Signature",
+    "SignatureMethod",
+    "SignatureNonce",
+    "SignatureVersion",
+    "Timestamp",
+    "Version",
+    "sign_mode",
+])
+
+
+class TrafficRecorder(object):
+    """ 记录请求，供 replay 回放压测。
+
+    每行一个 JSON：相对时间（秒）、method、endpoint、业务参数及 body 长度。
+    不记录 body 内容、密钥及签名。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # 按行缓冲，进程异常退出时最多丢失正在写入的一行
+        self._file = open(path, "a", buffering=1)
+        self._start = None
+
+    def record(self, method, endpoint, params, body=""):
+        now = time.time()
+        if self._start is None:
+            self._start = now
+
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+
+        descriptor = {
+            "t": round(now - self._start, 6),
+            "method": method,
+            "endpoint": endpoint,
+            "params": {
+                k: v for k, v in (params or {}).items()
+                if k not in SECRET_PARAMS
+            },
+            "body_size": len(body or b""),
+        }
+        self._file.write(json.dumps(descriptor, sort_keys=True) + "\n")
+
+    def close(self):
+        self._file.close()
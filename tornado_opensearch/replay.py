@@ -0,0 +1,174 @@
+# coding: utf-8
+""" 回放 TrafficRecorder 的记录，用于压测。
+
+    python -m tornado_opensearch.replay traffic.jsonl \\
+        --base-url http://127.0.0.1:8888 --speed 2 --concurrency 20
+"""
+import sys
+import json
+import time
+import logging
+import argparse
+from collections import Counter
+
+from tornado import gen
+from tornado.gen import coroutine
+from tornado.ioloop import IOLoop
+from tornado.httpclient import AsyncHTTPClient
+from tornado.locks import Semaphore
+
+from tornado_opensearch.api_requestor import APIRequestor
+from tornado_opensearch.resource import API_VERSION
+
+
+logger = logging.getLogger("tornado_opensearch")
+
+
+def load(path):
+    """ 读取记录。最后一行不完整时（录制进程异常退出）跳过该行"""
+    with open(path) as f:
+        lines = [line for line in f if line.strip()]
+
+    descriptors = []
+    for i, line in enumerate(lines):
+        try:
+            descriptors.append(json.loads(line))
+        except ValueError:
+            if i < len(lines) - 1:
+                raise
+            logger.warning("跳过不完整的最后一行: %s", path)
+    return descriptors
+
+
+def percentile(values, p):
+    """ 取百分位数（最近秩）"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = max(0, int(round(p / 100.0 * len(values))) - 1)
+    return values[min(index, len(values) - 1)]
+
+
+@coroutine
+def replay(descriptors, api_baseurl, speed=1.0, concurrency=10,
+           api_key="", api_secret="", api_version=API_VERSION, client=None):
+    """ 按记录的时间间隔（除以 speed）重新发起请求，speed 为 0 时不等待。
+    返回吞吐量及延迟分布。
+    """
+    own_client = client is None
+    if own_client:
+        # 共享的 AsyncHTTPClient 默认只有 10 个连接，会限制并发数
+        client = AsyncHTTPClient(force_instance=True, max_clients=concurrency)
+
+    requestor = APIRequestor(
+        api_baseurl, api_key, api_secret, api_version, client=client
+    )
+    semaphore = Semaphore(concurrency)
+    latencies = []
+    errors = Counter()
+
+    @coroutine
+    def issue(descriptor):
+        yield semaphore.acquire()
+        try:
+            body = ""
+            if descriptor["method"] == "POST":
+                body = "x" * descriptor["body_size"]
+
+            begin = time.time()
+            try:
+                response = yield requestor.request_raw(
+                    descriptor["method"],
+                    descriptor["endpoint"],
+                    dict(descriptor["params"]),
+                    body
+                )
+            except Exception as e:
+                errors[type(e).__name__] += 1
+            else:
+                if response.code >= 400:
+                    errors["HTTP %d" % response.code] += 1
+            latencies.append(time.time() - begin)
+        finally:
+            semaphore.release()
+
+    start = time.time()
+    futures = []
+    try:
+        for descriptor in descriptors:
+            if speed:
+                delay = start + descriptor["t"] / speed - time.time()
+                if delay > 0:
+                    yield gen.sleep(delay)
+            futures.append(issue(descriptor))
+
+        yield futures
+    finally:
+        if own_client:
+            client.close()
+    elapsed = time.time() - start
+
+    return {
+        "requests": len(descriptors),
+        "errors": sum(errors.values()),
+        "error_types": dict(errors),
+        "elapsed": elapsed,
+        "throughput": elapsed and len(descriptors) / elapsed,
+        "latency": {
+            "p50": percentile(latencies, 50),
+            "p90": percentile(latencies, 90),
+            "p99": percentile(latencies, 99),
+            "max": max(latencies or [0.0]),
+        },
+    }
+
+
+def format_report(report):
+    latency = report["latency"]
+    lines = [
+        "requests:   %d (%d errors)" % (report["requests"], report["errors"]),
+    ]
+    lines.extend(
+        "  %s: %d" % (name, count)
+        for name, count in sorted(report["error_types"].items())
+    )
+    lines.extend([
+        "elapsed:    %.2fs" % report["elapsed"],
+        "throughput: %.2f req/s" % report["throughput"],
+        "latency:    p50 %.2fms, p90 %.2fms, p99 %.2fms, max %.2fms" % (
+            1000.0 * latency["p50"],
+            1000.0 * latency["p90"],
+            1000.0 * latency["p99"],
+            1000.0 * latency["max"],
+        ),
+    ])
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m tornado_opensearch.replay",
+        description="Replay recorded OpenSearch traffic."
+    )
+    parser.add_argument("recording")
+    parser.add_argument("--base-url", required=True)
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="playback speed, 0 for as fast as possible")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--api-key", default="")
+    parser.add_argument("--api-secret", default="")
+    args = parser.parse_args(argv)
+
+    descriptors = load(args.recording)
+    report = IOLoop.current().run_sync(lambda: replay(
+        descriptors, args.base_url,
+        speed=args.speed,
+        concurrency=args.concurrency,
+        api_key=args.api_key,
+        api_secret=args.api_secret
+    ))
+    print(format_report(report))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
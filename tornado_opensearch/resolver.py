@@ -0,0 +1,153 @@
+# coding: utf-8
+import time
+import socket
+import logging
+import urllib.parse
+
+from tornado.gen import coroutine
+from tornado.ioloop import IOLoop
+from tornado.httpclient import AsyncHTTPClient
+from tornado.netutil import Resolver, ThreadedResolver
+
+
+logger = logging.getLogger("tornado_opensearch")
+
+
+class CachingResolver(Resolver):
+    """ 带缓存的 DNS 解析。
+
+    结果缓存 ttl 秒。超过 ttl * refresh 后仍返回缓存，同时在后台重新解析；
+    过期后重新解析失败时，继续使用过期的结果。
+
+    SimpleAsyncHTTPClient 直接使用该 resolver；CurlAsyncHTTPClient 通过
+    CURLOPT_RESOLVE 使用解析结果（见 create_client 及 pin_address）：
+
+        resolver = CachingResolver(ttl=60)
+        api = OpenSearch(resolver=resolver, ...)
+    """
+
+    def initialize(self, resolver=None, ttl=300.0, refresh=0.8):
+        self.resolver = resolver or ThreadedResolver()
+        self.ttl = ttl
+        self.refresh = refresh
+
+        self._cache = {}
+        self._refreshing = set()
+
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    def close(self):
+        self.resolver.close()
+
+    @coroutine
+    def resolve(self, host, port, family=socket.AF_UNSPEC):
+        key = (host, port, family)
+        entry = self._cache.get(key)
+
+        if entry is not None:
+            addrinfo, resolved_at = entry
+            age = time.time() - resolved_at
+
+            if age < self.ttl:
+                self.hits += 1
+                if age >= self.ttl * self.refresh:
+                    self._refresh_later(key)
+                return addrinfo
+
+        self.misses += 1
+        try:
+            addrinfo = yield self._resolve(key)
+        except Exception:
+            if entry is None:
+                raise
+            logger.warning("DNS 解析失败，使用过期的结果: %s", host)
+            return entry[0]
+
+        return addrinfo
+
+    @coroutine
+    def _resolve(self, key):
+        addrinfo = yield self.resolver.resolve(*key)
+        self._cache[key] = (addrinfo, time.time())
+        return addrinfo
+
+    def _refresh_later(self, key):
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        IOLoop.current().spawn_callback(self._refresh, key)
+
+    @coroutine
+    def _refresh(self, key):
+        try:
+            yield self._resolve(key)
+            self.refreshes += 1
+        except Exception:
+            logger.warning("DNS 后台解析失败: %s", key[0], exc_info=True)
+        finally:
+            self._refreshing.discard(key)
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "entries": len(self._cache),
+        }
+
+
+def curl_client_class():
+    """ 安装了 pycurl 时返回 CurlAsyncHTTPClient，否则返回 None"""
+    try:
+        from tornado.curl_httpclient import CurlAsyncHTTPClient
+    except ImportError:
+        return None
+    return CurlAsyncHTTPClient
+
+
+def is_curl_client(client):
+    cls = curl_client_class()
+    return cls is not None and isinstance(client, cls)
+
+
+def uses_resolver(client, resolver):
+    """ client 发出的请求是否会使用 resolver 的解析结果"""
+    return (is_curl_client(client) or
+            getattr(client, "resolver", None) is resolver)
+
+
+def create_client(resolver=None, **kwargs):
+    """ 创建独立的 HTTP 客户端。
+    安装了 pycurl 时使用 CurlAsyncHTTPClient 以保持连接，
+    否则使用 SimpleAsyncHTTPClient 并交给它 resolver。
+    """
+    cls = curl_client_class()
+    if cls is not None:
+        return cls(force_instance=True, **kwargs)
+
+    if resolver is not None:
+        kwargs["resolver"] = resolver
+    return AsyncHTTPClient(force_instance=True, **kwargs)
+
+
+@coroutine
+def pin_address(request, resolver):
+    """ 用 resolver 解析请求的域名，并通过 CURLOPT_RESOLVE 交给 curl"""
+    url = urllib.parse.urlsplit(request.url)
+    port = url.port or (443 if url.scheme == "https" else 80)
+
+    addrinfo = yield resolver.resolve(url.hostname, port)
+    family, sockaddr = addrinfo[0]
+    address = sockaddr[0]
+    if family == socket.AF_INET6:
+        address = "[%s]" % address
+
+    entry = "%s:%d:%s" % (url.hostname, port, address)
+
+    def prepare(curl):
+        import pycurl
+        curl.setopt(pycurl.RESOLVE, [entry])
+
+    request.prepare_curl_callback = prepare
@@ -1,15 +1,25 @@
 # coding: utf-8
 import json
+import time
+import logging
+import urllib.parse
 
 import tornado
 from tornado.gen import coroutine
+from tornado.httpclient import AsyncHTTPClient, HTTPRequest
 
 from tornado_opensearch.api_requestor import APIRequestor
+from tornado_opensearch.resolver import (
+    create_client, is_curl_client, uses_resolver, pin_address
+)
+from tornado_opensearch.tail import ErrorLogTailer
 from tornado_opensearch import util
 
 
 API_VERSION = "v2"
 
+logger = logging.getLogger("tornado_opensearch")
+
 
 class APIResource(object):
     def __init__(self, **kwargs):
@@ -18,9 +28,50 @@ class APIResource(object):
         self.api_secret = kwargs.get("api_secret")
         self.api_version = kwargs.get("api_version") or API_VERSION
         self.debug = kwargs.get("debug") or False
+        self.client = kwargs.get("client")
+        self.limiter = kwargs.get("limiter")
+        self.scheduler = kwargs.get("scheduler")
+        self.recorder = kwargs.get("recorder")
+        self.resolver = kwargs.get("resolver")
+        self.fast_request_time = kwargs.get("fast_request_time") or 0.2
 
         self.app_name = kwargs.get("app_name")
 
+        # 单位：秒；除 created_at 外均为距 created_at 的时间
+        self._stats = {
+            "created_at": time.time(),
+            "warmup_time": None,
+            "first_request_time": None,
+            "first_fast_request_time": None,
+        }
+
+        if (self.client is not None and self.resolver is not None and
+                not uses_resolver(self.client, self.resolver)):
+            logger.warning(
+                "指定的 client 不使用 resolver，请求仍使用系统 DNS 解析"
+            )
+
+    def stats(self):
+        """ 启动耗时统计"""
+        return dict(self._stats)
+
+    def get_client(self):
+        """ 指定了 resolver 时创建独立的 HTTP 客户端（见 create_client）"""
+        if self.client is None and self.resolver is not None:
+            self.client = create_client(resolver=self.resolver)
+        return self.client
+
+    def _record_timing(self, start):
+        now = time.time()
+        since_created = now - self._stats["created_at"]
+
+        if self._stats["first_request_time"] is None:
+            self._stats["first_request_time"] = since_created
+
+        if (self._stats["first_fast_request_time"] is None and
+                now - start <= self.fast_request_time):
+            self._stats["first_fast_request_time"] = since_created
+
     @coroutine
     def request(self, *args, **kwargs):
         requestor = APIRequestor(
@@ -28,12 +79,59 @@ class APIResource(object):
             self.api_key,
             self.api_secret,
             self.api_version,
+            client=self.get_client(),
+            limiter=self.limiter,
+            scheduler=self.scheduler,
+            recorder=self.recorder,
+            resolver=self.resolver,
             debug=self.debug
         )
 
+        start = time.time()
         response = yield requestor.request(*args, **kwargs)
+        self._record_timing(start)
         return response
 
+    @coroutine
+    def warmup(self, connections=4):
+        """ 预热：解析域名并预先建立 connections 个连接。
+        只有 CurlAsyncHTTPClient 会保持连接；使用其他客户端时只预先解析域名，
+        并记录警告。
+        """
+        start = time.time()
+        url = urllib.parse.urlsplit(self.api_baseurl)
+
+        if self.resolver is not None:
+            port = url.port or (443 if url.scheme == "https" else 80)
+            try:
+                yield self.resolver.resolve(url.hostname, port)
+            except Exception:
+                logger.warning("预热 DNS 解析失败: %s", url.hostname,
+                               exc_info=True)
+
+        client = self.get_client() or AsyncHTTPClient()
+
+        @coroutine
+        def connect():
+            request = HTTPRequest(self.api_baseurl, method="HEAD")
+            try:
+                if self.resolver is not None:
+                    yield pin_address(request, self.resolver)
+                yield client.fetch(request, raise_error=False)
+            except Exception:
+                logger.warning("预热连接失败: %s", self.api_baseurl,
+                               exc_info=True)
+
+        if is_curl_client(client):
+            yield [connect() for _ in range(connections)]
+        else:
+            logger.warning(
+                "%s 不保持连接，warmup 只能预先解析域名",
+                type(client).__name__
+            )
+
+        self._stats["warmup_time"] = time.time() - start
+
 
 class OpenSearch(APIResource):
     """ OpenSearch v2 API """
@@ -77,7 +175,7 @@ class OpenSearch(APIResource):
     @coroutine
     def search(self, query, index_name=None, fetch_fields="",
                qp="", disable="", first_formula_name="",
-               formula_name="", summary=""):
+               formula_name="", summary="", priority=None):
         """ 搜索
         REF: https://help.aliyun.com/document_detail/29150.html
         """
@@ -117,12 +215,14 @@ class OpenSearch(APIResource):
         result = yield self.request(
             method="GET",
             endpoint=endpoint,
-            params=params
+            params=params,
+            priority=priority
         )
         return result
 
     @coroutine
-    def suggest(self, query, suggest_name, index_name=None, hit=None):
+    def suggest(self, query, suggest_name, index_name=None, hit=None,
+                priority=None):
         """ 下拉提示"""
         endpoint = "/suggest"
 
@@ -138,12 +238,13 @@ class OpenSearch(APIResource):
         result = yield self.request(
             method="GET",
             endpoint=endpoint,
-            params=params
+            params=params,
+            priority=priority
         )
         return result
 
     @coroutine
-    def upload_data(self, table_name, items, app_name=None):
+    def upload_data(self, table_name, items, app_name=None, priority=None):
         """ 上传数据"""
         endpoint = "/index/doc/" + (app_name or self.app_name)
         params = {
@@ -155,12 +256,13 @@ class OpenSearch(APIResource):
             method="POST",
             endpoint=endpoint,
             params=params,
-            body=body
+            body=body,
+            priority=priority
         )
         return result
 
     @coroutine
-    def list_apps(self, page=1, page_size=10):
+    def list_apps(self, page=1, page_size=10, priority=None):
         """ 取得应用列表"""
         endpoint = "/index"
 
@@ -172,12 +274,13 @@ class OpenSearch(APIResource):
         result = yield self.request(
             method="GET",
             endpoint=endpoint,
-            params=params
+            params=params,
+            priority=priority
         )
         return result
 
     @coroutine
-    def get_app(self, app_name=None):
+    def get_app(self, app_name=None, priority=None):
         """ 取得应用信息"""
         endpoint = "/index/" + (app_name or self.app_name)
 
@@ -186,12 +289,13 @@ class OpenSearch(APIResource):
         result = yield self.request(
             method="GET",
             endpoint=endpoint,
-            params=params
+            params=params,
+            priority=priority
         )
         return result
 
     @coroutine
-    def create_app(self, template="", app_name=None):
+    def create_app(self, template="", app_name=None, priority=None):
         """ 创建应用（仅支持从模版创建）"""
         endpoint = "/index/" + (app_name or self.app_name)
 
@@ -203,12 +307,13 @@ class OpenSearch(APIResource):
         result = yield self.request(
             method="POST",
             endpoint=endpoint,
-            params=params
+            params=params,
+            priority=priority
         )
         return result
 
     @coroutine
-    def delete_app(self, app_name=None):
+    def delete_app(self, app_name=None, priority=None):
         """ 删除应用"""
         endpoint = "/index/" + (app_name or self.app_name)
 
@@ -217,12 +322,13 @@ class OpenSearch(APIResource):
         result = yield self.request(
             method="POST",
             endpoint=endpoint,
-            params=params
+            params=params,
+            priority=priority
         )
         return result
 
     @coroutine
-    def rebuild_index(self, table_names=(), app_name=None):
+    def rebuild_index(self, table_names=(), app_name=None, priority=None):
         """ 索引重建"""
         endpoint = "/index/" + (app_name or self.app_name)
 
@@ -239,13 +345,14 @@ class OpenSearch(APIResource):
         result = yield self.request(
             method="GET",
             endpoint=endpoint,
-            params=params
+            params=params,
+            priority=priority
         )
         return result
 
     @coroutine
     def get_error_log(self, page=1, page_size=20,
-                      sort_mode="DESC", app_name=None):
+                      sort_mode="DESC", app_name=None, priority=None):
         """ 取得错误日志"""
         endpoint = "/index/error/" + (app_name or self.app_name)
 
@@ -257,6 +364,11 @@ class OpenSearch(APIResource):
         result = yield self.request(
             method="GET",
             endpoint=endpoint,
-            params=params
+            params=params,
+            priority=priority
         )
         return result
+
+    def tail_error_log(self, cursor=None, app_name=None, **kwargs):
+        """ 增量拉取错误日志，返回可用 async for 迭代的 ErrorLogTailer"""
+        return ErrorLogTailer(self, app_name=app_name, cursor=cursor, **kwargs)
@@ -0,0 +1,138 @@
+# coding: utf-8
+import time
+from collections import deque
+
+from tornado.concurrent import Future
+from tornado.gen import coroutine
+
+from tornado_opensearch import error
+
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BACKGROUND = 2
+
+DEFAULT_WEIGHTS = {
+    PRIORITY_INTERACTIVE: 8,
+    PRIORITY_NORMAL: 4,
+    PRIORITY_BACKGROUND: 1,
+}
+
+# 按前缀匹配 endpoint 的默认优先级，先匹配者优先
+DEFAULT_PRIORITIES = (
+    ("/search", PRIORITY_INTERACTIVE),
+    ("/suggest", PRIORITY_INTERACTIVE),
+    ("/index/error/", PRIORITY_NORMAL),
+    ("/index", PRIORITY_BACKGROUND),
+)
+
+
+class _Class(object):
+    def __init__(self, weight):
+        self.weight = weight
+        self.current = 0
+        self.waiters = deque()
+
+        self.dispatched = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+
+class PriorityScheduler(object):
+    """ 按优先级调度 HTTP 请求。
+
+    同时进行的请求数不超过 max_concurrency，其中 reserved 个名额只留给
+    最高优先级。排队的请求按权重公平出队（平滑加权轮询），
+    避免后台的批量写入阻塞用户的搜索请求。
+
+    max_concurrency 应不大于 AsyncHTTPClient 的 max_clients，
+    否则请求仍会在 HTTP 客户端内部排队。
+    """
+
+    def __init__(self, max_concurrency=10, reserved=2, weights=None,
+                 priorities=DEFAULT_PRIORITIES,
+                 default_priority=PRIORITY_NORMAL):
+        self.max_concurrency = max_concurrency
+        self.reserved = reserved
+        self.priorities = priorities
+        self.default_priority = default_priority
+
+        weights = weights or DEFAULT_WEIGHTS
+        self._classes = {
+            priority: _Class(weight)
+            for priority, weight in weights.items()
+        }
+        self._highest = min(self._classes)
+        self.in_flight = 0
+
+    def priority_for(self, endpoint, priority=None):
+        """ 返回请求的优先级，未指定时按 endpoint 取默认值"""
+        if priority is None:
+            priority = self.default_priority
+            for prefix, value in self.priorities:
+                if endpoint.startswith(prefix):
+                    priority = value
+                    break
+
+        if priority not in self._classes:
+            raise error.APIError("Bad request priority: %s" % priority)
+
+        return priority
+
+    @coroutine
+    def acquire(self, priority):
+        """ 等待一个连接名额"""
+        waiter = Future()
+        self._classes[priority].waiters.append((time.time(), waiter))
+        self._dispatch()
+        yield waiter
+
+    def release(self):
+        """ 归还连接名额"""
+        self.in_flight -= 1
+        self._dispatch()
+
+    def _capacity(self, priority):
+        if priority == self._highest:
+            return self.max_concurrency
+        return self.max_concurrency - self.reserved
+
+    def _dispatch(self):
+        while True:
+            eligible = [
+                (priority, cls) for priority, cls in self._classes.items()
+                if cls.waiters and self.in_flight < self._capacity(priority)
+            ]
+            if not eligible:
+                return
+
+            # 平滑加权轮询
+            total = 0
+            chosen = None
+            for priority, cls in eligible:
+                cls.current += cls.weight
+                total += cls.weight
+                if chosen is None or cls.current > chosen.current:
+                    chosen = cls
+            chosen.current -= total
+
+            enqueued_at, waiter = chosen.waiters.popleft()
+            wait = time.time() - enqueued_at
+            chosen.dispatched += 1
+            chosen.wait_total += wait
+            chosen.wait_max = max(chosen.wait_max, wait)
+
+            self.in_flight += 1
+            waiter.set_result(None)
+
+    def stats(self):
+        """ 各优先级的排队数及等待时间（秒）"""
+        return {
+            priority: {
+                "queued": len(cls.waiters),
+                "dispatched": cls.dispatched,
+                "wait_avg": cls.dispatched and cls.wait_total / cls.dispatched,
+                "wait_max": cls.wait_max,
+            }
+            for priority, cls in self._classes.items()
+        }
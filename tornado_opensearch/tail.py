@@ -0,0 +1,210 @@
+# coding: utf-8
+import json
+import hashlib
+import logging
+import itertools
+from collections import deque
+
+from tornado import gen
+from tornado.gen import coroutine
+
+from tornado_opensearch import error
+
+
+logger = logging.getLogger("tornado_opensearch")
+
+
+class ErrorLogCursor(object):
+    """ 错误日志游标，按 app_name 记录最后一次看到的时间戳及该时间戳下的条目。
+    可以通过 dumps/loads 持久化。
+    """
+
+    def __init__(self, positions=None):
+        self.positions = dict(positions or {})
+
+    def get(self, app_name):
+        """ 返回 (timestamp, ids)"""
+        position = self.positions.get(app_name) or {}
+        return position.get("timestamp"), set(position.get("ids", ()))
+
+    def advance(self, app_name, entries):
+        """ 根据新条目（按时间升序）推进游标"""
+        if not entries:
+            return
+
+        timestamp, ids = self.get(app_name)
+        for entry in entries:
+            entry_time = entry_timestamp(entry)
+            if timestamp is None or entry_time > timestamp:
+                timestamp, ids = entry_time, set()
+            if entry_time == timestamp:
+                ids.add(entry_id(entry))
+
+        self.positions[app_name] = {
+            "timestamp": timestamp,
+            "ids": sorted(ids),
+        }
+
+    def is_known(self, app_name, entry):
+        timestamp, ids = self.get(app_name)
+        if timestamp is None:
+            return False
+
+        entry_time = entry_timestamp(entry)
+        if entry_time < timestamp:
+            return True
+        return entry_time == timestamp and entry_id(entry) in ids
+
+    def dumps(self):
+        return json.dumps(self.positions, sort_keys=True)
+
+    @classmethod
+    def loads(cls, s):
+        return cls(json.loads(s) if s else None)
+
+    def save(self, path):
+        with open(path, "w") as f:
+            f.write(self.dumps())
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path) as f:
+                return cls.loads(f.read())
+        except FileNotFoundError:
+            return cls()
+
+
+def entry_timestamp(entry):
+    """ 取得错误日志条目的时间戳"""
+    for key in ("created", "time", "timestamp"):
+        if key in entry:
+            return entry[key]
+    return 0
+
+
+def entry_id(entry):
+    """ 错误日志条目的 ID；接口不返回 ID 时使用内容摘要"""
+    if "id" in entry:
+        return str(entry["id"])
+
+    content = json.dumps(entry, sort_keys=True).encode("utf-8")
+    return hashlib.sha1(content).hexdigest()
+
+
+def _entries(response):
+    result = response.get("result") or ()
+    if hasattr(result, "items") and "items" in result:
+        result = result["items"]
+    return list(result)
+
+
+class ErrorLogTailer(object):
+    """ 增量拉取错误日志。
+
+    按时间倒序逐页拉取，遇到游标中已知的条目即停止，因此每次只下载新条目。
+    max_pages 为 None 时一直翻页直到遇到已知条目；指定时超出的条目会被跳过，
+    并记录警告。游标中没有该应用的位置时，只拉取最新的 initial_pages 页，
+    不下载全部历史。
+    轮询间隔随错误频率自动调整：有新错误时缩短，没有时或请求失败时延长。
+
+        tailer = api.tail_error_log()
+        async for entry in tailer:
+            ...
+    """
+
+    def __init__(self, api, app_name=None, cursor=None, page_size=20,
+                 max_pages=None, initial_pages=1,
+                 min_interval=1.0, max_interval=60.0):
+        self.api = api
+        self.app_name = app_name or api.app_name
+        self.cursor = cursor or ErrorLogCursor()
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.initial_pages = initial_pages
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+
+        self.interval = min_interval
+        self._buffer = deque()
+        self._polled = False
+        self._closed = False
+
+    @coroutine
+    def poll(self):
+        """ 拉取一次新条目，按时间升序返回，并推进游标"""
+        has_position = self.cursor.get(self.app_name)[0] is not None
+        max_pages = self.max_pages if has_position else self.initial_pages
+
+        new_entries = []
+        seen = set()
+        complete = False
+        for page in itertools.count(1):
+            if max_pages is not None and page > max_pages:
+                break
+
+            response = yield self.api.get_error_log(
+                page=page,
+                page_size=self.page_size,
+                sort_mode="DESC",
+                app_name=self.app_name
+            )
+            entries = _entries(response)
+
+            for entry in entries:
+                if self.cursor.is_known(self.app_name, entry):
+                    complete = True
+                    break
+                # 翻页期间有新错误写入时，后续页会与已取得的条目重叠
+                key = entry_id(entry)
+                if key not in seen:
+                    seen.add(key)
+                    new_entries.append(entry)
+
+            if complete or len(entries) < self.page_size:
+                complete = True
+                break
+
+        if not complete and has_position:
+            logger.warning(
+                "错误日志超过 %d 页，较早的新条目未被拉取: %s",
+                max_pages, self.app_name
+            )
+
+        new_entries.reverse()
+        self.cursor.advance(self.app_name, new_entries)
+        self._adapt(len(new_entries))
+
+        return new_entries
+
+    def _adapt(self, count):
+        if count:
+            self.interval = max(self.min_interval, self.interval / 2)
+        else:
+            self.interval = min(self.max_interval, self.interval * 2)
+
+    def close(self):
+        """ 停止迭代"""
+        self._closed = True
+
+    def __aiter__(self):
+        return self
+
+    @coroutine
+    def __anext__(self):
+        while not self._buffer:
+            if self._closed:
+                raise StopAsyncIteration
+            if self._polled:
+                yield gen.sleep(self.interval)
+            self._polled = True
+            try:
+                entries = yield self.poll()
+            except error.APIError as e:
+                # 临时错误不结束迭代，延长间隔后重试
+                logger.warning("拉取错误日志失败: %s, %s", self.app_name, e)
+                self.interval = min(self.max_interval, self.interval * 2)
+                continue
+            self._buffer.extend(entries)
+
+        return self._buffer.popleft()
@@ -1,4 +1,12 @@
 # coding: utf-8
 from tornado_opensearch.test.test_api_requestor import *
+from tornado_opensearch.test.test_blocking import *
+from tornado_opensearch.test.test_limiter import *
+from tornado_opensearch.test.test_outbox import *
+from tornado_opensearch.test.test_recorder import *
+from tornado_opensearch.test.test_replay import *
+from tornado_opensearch.test.test_resolver import *
 from tornado_opensearch.test.test_resource import *
+from tornado_opensearch.test.test_scheduler import *
+from tornado_opensearch.test.test_tail import *
 from tornado_opensearch.test.test_util import *
@@ -4,10 +4,13 @@ from collections import OrderedDict
 
 from tornado.gen import coroutine
 from tornado.concurrent import Future
-from tornado.testing import AsyncTestCase, gen_test
+from tornado.web import Application, RequestHandler
+from tornado.testing import AsyncTestCase, AsyncHTTPTestCase, gen_test
+from tornado.testing import bind_unused_port
 
 import tornado_opensearch.api_requestor as api_requestor
 import tornado_opensearch.error as error
+from tornado_opensearch.scheduler import PriorityScheduler, PRIORITY_BACKGROUND
 
 
 class SingatorTests(AsyncTestCase):
@@ -121,3 +124,85 @@ class APIRequestorTests(AsyncTestCase):
 
             with self.assertRaises(error.APIError):
                 result = yield requestor.request("POST", "", {}, "")
+
+    @gen_test
+    def test_request_limiter(self):
+        with mock.patch("tornado_opensearch.api_requestor.AsyncHTTPClient", autospec=True) as M:
+            fut = Future()
+            fut.set_result(mock.Mock(
+                code=503, request_time=0.1, effective_url="",
+                body='{"status": "FAIL"}'.encode("utf8")
+            ))
+            M.return_value.fetch.return_value = fut
+            limiter = mock.Mock()
+            limiter.acquire.return_value = Future()
+            limiter.acquire.return_value.set_result(None)
+
+            requestor = self._make_one()
+            requestor.limiter = limiter
+            yield requestor.request_raw("GET", "/search", {})
+
+            limiter.acquire.assert_called_once_with("/search")
+            limiter.release.assert_called_once_with("/search", 0.1, False)
+
+    @gen_test
+    def test_request_scheduler(self):
+        with mock.patch("tornado_opensearch.api_requestor.AsyncHTTPClient", autospec=True) as M:
+            fut = Future()
+            fut.set_result(mock.Mock(
+                code=200, request_time=0.1, effective_url="",
+                body='{"status": "OK"}'.encode("utf8")
+            ))
+            M.return_value.fetch.return_value = fut
+
+            requestor = self._make_one()
+            requestor.scheduler = PriorityScheduler()
+            result = yield requestor.request("POST", "/index/doc/app", {})
+
+            self.assertEqual(result["status"], "OK")
+            self.assertEqual(requestor.scheduler.in_flight, 0)
+            stats = requestor.scheduler.stats()
+            self.assertEqual(stats[PRIORITY_BACKGROUND]["dispatched"], 1)
+
+
+class StubHandler(RequestHandler):
+    def get(self, status):
+        self.set_status(int(status))
+        self.write({"status": "OK" if status == "200" else "FAIL"})
+
+
+class APIRequestorHTTPTests(AsyncHTTPTestCase):
+    """ 使用真实的 HTTP 客户端测试请求"""
+
+    def get_app(self):
+        return Application([(r"/(\d+)", StubHandler)])
+
+    def _make_one(self):
+        return api_requestor.APIRequestor(
+            api_baseurl=self.get_url(""),
+            api_key="testkey",
+            api_secret="testsecret",
+            api_version="v2",
+            client=self.http_client
+        )
+
+    @gen_test
+    def test_request_ok(self):
+        result = yield self._make_one().request("GET", "/200", {})
+        self.assertEqual(result["status"], "OK")
+
+    @gen_test
+    def test_request_500(self):
+        with self.assertRaises(error.APIError):
+            yield self._make_one().request("GET", "/500", {})
+
+    @gen_test
+    def test_request_refused(self):
+        """ 测试连接失败时抛出 APIError"""
+        sock, port = bind_unused_port()
+        sock.close()
+
+        requestor = self._make_one()
+        requestor.api_baseurl = "http://127.0.0.1:%d" % port
+        with self.assertRaises(error.Unavailable):
+            yield requestor.request("GET", "/200", {})
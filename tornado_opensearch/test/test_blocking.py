@@ -0,0 +1,151 @@
+# coding: utf-8
+import time
+import threading
+from unittest import mock, TestCase
+
+from tornado import gen
+from tornado.gen import coroutine
+
+import tornado_opensearch.blocking as blocking
+import tornado_opensearch.error as error
+
+
+class DummyAPIRequestor(mock.MagicMock):
+    @coroutine
+    def request(self, method, endpoint, params, body="", priority=None):
+        if params.get("query") == "fail":
+            raise error.APIError("fail")
+        if params.get("query") == "slow":
+            yield gen.sleep(10)
+        return {"status": "OK", "endpoint": endpoint, "params": params}
+
+
+class BlockingOpenSearchTests(TestCase):
+    maxDiff = 1000
+
+    def setUp(self):
+        self.patch_requestor = mock.patch(
+            "tornado_opensearch.resource.APIRequestor",
+            new=DummyAPIRequestor
+        )
+        self.MockAPIRequestor = self.patch_requestor.start()
+
+        self.api = blocking.BlockingOpenSearch(
+            api_baseurl="",
+            api_key="testkey",
+            api_secret="testsecret",
+            app_name="testapp"
+        )
+
+        super().setUp()
+
+    def tearDown(self):
+        self.api.close()
+        self.patch_requestor.stop()
+
+        super().tearDown()
+
+    def test_search(self):
+        """ 测试同步搜索"""
+        result = self.api.search(query="hello")
+        self.assertEqual(result["endpoint"], "/search")
+        self.assertEqual(result["params"]["query"], "hello")
+
+    def test_error(self):
+        """ 测试异常传递"""
+        with self.assertRaises(error.APIError):
+            self.api.search(query="fail")
+
+    def test_search_many(self):
+        """ 测试并发搜索，结果保持顺序"""
+        queries = ["q%d" % i for i in range(20)]
+        results = self.api.search_many(queries)
+        self.assertEqual(
+            [r["params"]["query"] for r in results],
+            queries
+        )
+
+    def test_upload_many(self):
+        """ 测试并发上传"""
+        batches = iter([[{"id": 1}], [{"id": 2}]])
+        results = self.api.upload_many("main", batches)
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0]["endpoint"], "/index/doc/testapp")
+
+    def test_threads(self):
+        """ 测试多线程同时调用"""
+        results = []
+
+        def worker(i):
+            results.append(self.api.search(query="q%d" % i))
+
+        threads = [
+            threading.Thread(target=worker, args=(i,)) for i in range(8)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(results), 8)
+
+    def test_closed(self):
+        """ 测试关闭后调用"""
+        self.api.close()
+        with self.assertRaises(error.Error):
+            self.api.search(query="hello")
+
+    def test_setup_error(self):
+        """ 测试创建 HTTP 客户端失败时构造函数抛出异常"""
+        with mock.patch("tornado_opensearch.blocking.create_client",
+                        side_effect=TypeError("resolver")):
+            with self.assertRaises(TypeError):
+                blocking.BlockingOpenSearch(api_baseurl="")
+
+    def test_close_in_loop_thread(self):
+        """ 测试在后台线程中关闭"""
+        errors = []
+
+        def close():
+            try:
+                self.api.close()
+            except error.Error as e:
+                errors.append(e)
+
+        self.api._io_loop.add_callback(close)
+        self.api.search(query="hello")
+        self.assertEqual(len(errors), 1)
+
+    def test_map_in_loop_thread(self):
+        """ 测试在后台线程中调用 map"""
+        errors = []
+
+        def run():
+            try:
+                self.api.map("search", ["q"])
+            except error.Error as e:
+                errors.append(e)
+
+        self.api._io_loop.add_callback(run)
+        self.api.search(query="hello")
+        self.assertEqual(len(errors), 1)
+
+    def test_close_with_pending_calls(self):
+        """ 测试关闭时未完成的调用抛出异常"""
+        errors = []
+
+        def worker():
+            try:
+                self.api.search(query="slow")
+            except error.Error as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        time.sleep(0.05)
+
+        self.api.close()
+        thread.join(1)
+
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(len(errors), 1)
@@ -0,0 +1,52 @@
+# coding: utf-8
+from tornado.testing import AsyncTestCase, gen_test
+
+import tornado_opensearch.limiter as limiter
+import tornado_opensearch.error as error
+
+
+class AdaptiveLimiterTests(AsyncTestCase):
+    maxDiff = 1000
+
+    def _make_one(self, **kwargs):
+        return limiter.AdaptiveLimiter(**kwargs)
+
+    @gen_test
+    def test_queue(self):
+        """ 测试超出上限的请求排队"""
+        lim = self._make_one(initial_limit=1, max_queue=1)
+
+        yield lim.acquire("/search")
+        waiter = lim.acquire("/search")
+        self.assertFalse(waiter.done())
+
+        with self.assertRaises(error.Overloaded):
+            yield lim.acquire("/search")
+
+        lim.release("/search")
+        yield waiter
+        self.assertEqual(lim.stats()["/search"], {
+            "limit": 1, "in_flight": 1, "queued": 0,
+        })
+
+    @gen_test
+    def test_aimd(self):
+        """ 测试上限随耗时及错误调整"""
+        lim = self._make_one(initial_limit=4, min_limit=2, max_limit=5,
+                             latency_threshold=0.5, backoff=0.5)
+
+        for _ in range(20):
+            yield lim.acquire("/search")
+            lim.release("/search", latency=0.1)
+        self.assertEqual(lim.limit("/search"), 5)
+
+        yield lim.acquire("/search")
+        lim.release("/search", latency=1.0)
+        self.assertEqual(lim.limit("/search"), 2)
+
+        yield lim.acquire("/search")
+        lim.release("/search", latency=0.1, ok=False)
+        self.assertEqual(lim.limit("/search"), 2)
+
+        # 其他 endpoint 不受影响
+        self.assertEqual(lim.limit("/suggest"), 4)
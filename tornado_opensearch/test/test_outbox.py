@@ -0,0 +1,276 @@
+# coding: utf-8
+import os
+import json
+import shutil
+import tempfile
+from unittest import mock
+
+from tornado import gen
+from tornado.gen import coroutine
+from tornado.testing import AsyncTestCase, gen_test
+
+import tornado_opensearch.outbox as outbox
+import tornado_opensearch.error as error
+
+
+class DummyOpenSearch(object):
+    app_name = "testapp"
+
+    def __init__(self):
+        self.calls = []
+        self.fail = False
+        self.exc = error.APIError
+
+    @coroutine
+    def upload_data(self, table_name, items, app_name=None):
+        yield gen.moment
+        if self.fail:
+            raise self.exc("fail")
+        self.calls.append((app_name, table_name, items))
+        return {"status": "OK"}
+
+
+class OutboxTests(AsyncTestCase):
+    maxDiff = 1000
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.api = DummyOpenSearch()
+        self.outboxes = []
+
+        super().setUp()
+
+    def tearDown(self):
+        for box in self.outboxes:
+            box.close()
+        shutil.rmtree(self.directory)
+
+        super().tearDown()
+
+    def _make_one(self, **kwargs):
+        box = outbox.Outbox(self.directory, self.api, **kwargs)
+        self.outboxes.append(box)
+        return box
+
+    def _corrupt(self, name, offset, data):
+        with open(os.path.join(self.directory, name), "r+b") as f:
+            f.seek(offset)
+            f.write(data)
+
+    @gen_test
+    def test_drain(self):
+        """ 测试合并相同表的记录并按顺序推送"""
+        box = self._make_one(batch_size=3)
+
+        yield [
+            box.put("main", [{"id": 1}]),
+            box.put("main", [{"id": 2}]),
+            box.put("other", [{"id": 3}]),
+            box.put("main", [{"id": 4}, {"id": 5}, {"id": 6}]),
+        ]
+
+        while (yield box.drain()):
+            pass
+
+        self.assertEqual(self.api.calls, [
+            ("testapp", "main", [{"id": 1}, {"id": 2}]),
+            ("testapp", "other", [{"id": 3}]),
+            ("testapp", "main", [{"id": 4}, {"id": 5}, {"id": 6}]),
+        ])
+
+    @gen_test
+    def test_restart(self):
+        """ 测试推送失败及重启后从检查点继续"""
+        box = self._make_one()
+        yield box.put("main", [{"id": 1}])
+        yield box.drain()
+        yield box.put("main", [{"id": 2}])
+
+        self.api.fail = True
+        with self.assertRaises(error.APIError):
+            yield box.drain()
+        box.close()
+
+        self.api.fail = False
+        box = self._make_one()
+        yield box.drain()
+
+        self.assertEqual(self.api.calls, [
+            ("testapp", "main", [{"id": 1}]),
+            ("testapp", "main", [{"id": 2}]),
+        ])
+
+    @gen_test
+    def test_compact(self):
+        """ 测试分段切换及删除已推送的分段"""
+        box = self._make_one(segment_size=64)
+        for i in range(5):
+            yield box.put("main", [{"id": i}], app_name="app")
+
+        self.assertEqual(len(box._segments()), 5)
+
+        while (yield box.drain()):
+            pass
+
+        self.assertEqual(box._segments(), [5])
+        self.assertEqual(
+            [items for _, _, items in self.api.calls],
+            [[{"id": i}] for i in range(5)]
+        )
+
+    @gen_test
+    def test_background(self):
+        """ 测试后台推送"""
+        box = self._make_one(drain_interval=0.01)
+        box.start()
+        yield box.put("main", [{"id": 1}])
+
+        for _ in range(100):
+            if self.api.calls:
+                break
+            yield gen.sleep(0.01)
+
+        box.stop()
+        self.assertEqual(self.api.calls, [("testapp", "main", [{"id": 1}])])
+
+    @gen_test
+    def test_torn_tail(self):
+        """ 测试重启后截掉末尾不完整的记录，之后的写入仍能推送"""
+        box = self._make_one()
+        yield box.put("main", [1])
+        box.close()
+
+        path = os.path.join(self.directory, "00000001.seg")
+        with open(path, "ab") as f:
+            f.write(b"\x00\x00\x01\x00ab")
+
+        box = self._make_one()
+        yield box.put("main", [2])
+        yield box.put("main", [3])
+
+        while (yield box.drain()):
+            pass
+
+        self.assertEqual(
+            [items for _, _, items in self.api.calls],
+            [[1, 2, 3]]
+        )
+
+    @gen_test
+    def test_write_error(self):
+        """ 测试写入失败时回滚本批数据"""
+        box = self._make_one()
+        yield box.put("main", [1])
+
+        with mock.patch("os.fsync", side_effect=OSError("ENOSPC")):
+            with self.assertRaises(OSError):
+                yield box.put("main", [2])
+
+        yield box.put("main", [3])
+        while (yield box.drain()):
+            pass
+
+        self.assertEqual(
+            [items for _, _, items in self.api.calls],
+            [[1, 3]]
+        )
+
+    @gen_test
+    def test_concurrent_drain(self):
+        """ 测试同时推送时不重复上传"""
+        box = self._make_one()
+        yield box.put("main", [1])
+
+        counts = yield [box.drain(), box.drain()]
+
+        self.assertEqual(sorted(counts), [0, 1])
+        self.assertEqual(len(self.api.calls), 1)
+
+    @gen_test
+    def test_corrupt_segment(self):
+        """ 测试跳过已写完的分段中损坏的记录"""
+        box = self._make_one(segment_size=64)
+        for i in range(3):
+            yield box.put("main", [i])
+
+        # 改写第一个分段中记录内容的最后一个字节
+        size = os.path.getsize(os.path.join(self.directory, "00000001.seg"))
+        self._corrupt("00000001.seg", size - 1, b"X")
+
+        while (yield box.drain()):
+            pass
+
+        self.assertEqual(
+            [items for _, _, items in self.api.calls],
+            [[1], [2]]
+        )
+        self.assertIn("00000001.seg.0.corrupt", os.listdir(self.directory))
+        self.assertEqual(box._segments(), [3])
+
+    @gen_test
+    def test_corrupt_header(self):
+        """ 测试记录长度损坏时找到下一条完整的记录"""
+        box = self._make_one()
+        for i in range(3):
+            yield box.put("main", [i])
+            if i == 0:
+                offset = box._file.tell()
+
+        box.close()
+        self._corrupt("00000001.seg", offset, b"\xff\xff\xff\xff")
+
+        # 重启时不会把损坏的记录当作末尾不完整的记录截掉
+        box = self._make_one()
+        while (yield box.drain()):
+            pass
+
+        self.assertEqual(
+            [items for _, _, items in self.api.calls],
+            [[0], [2]]
+        )
+        self.assertIn(
+            "00000001.seg.%d.corrupt" % offset, os.listdir(self.directory)
+        )
+
+    @gen_test
+    def test_dead_letter(self):
+        """ 测试一直被拒绝的数据写入 dead letter 后继续推送"""
+        box = self._make_one(max_retries=2)
+        yield box.put("main", [1])
+
+        self.api.fail = True
+        for _ in range(2):
+            with self.assertRaises(error.APIError):
+                yield box.drain()
+        count = yield box.drain()
+        self.assertEqual(count, 0)
+
+        self.api.fail = False
+        yield box.put("main", [2])
+        while (yield box.drain()):
+            pass
+
+        self.assertEqual(self.api.calls, [("testapp", "main", [2])])
+        with open(os.path.join(self.directory, "dead_letter.jsonl")) as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual(lines, [
+            {"a": "testapp", "t": "main", "i": [1], "error": "fail"}
+        ])
+
+    @gen_test
+    def test_unavailable(self):
+        """ 测试服务不可用时一直重试，不写入 dead letter"""
+        box = self._make_one(max_retries=1)
+        yield box.put("main", [1])
+
+        self.api.fail = True
+        self.api.exc = error.Unavailable
+        for _ in range(3):
+            with self.assertRaises(error.Unavailable):
+                yield box.drain()
+
+        self.api.fail = False
+        yield box.drain()
+
+        self.assertEqual(self.api.calls, [("testapp", "main", [1])])
+        self.assertNotIn("dead_letter.jsonl", os.listdir(self.directory))
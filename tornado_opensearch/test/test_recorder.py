@@ -0,0 +1,76 @@
+# coding: utf-8
+import os
+import json
+import shutil
+import tempfile
+from unittest import mock
+
+from tornado.concurrent import Future
+from tornado.testing import AsyncTestCase, gen_test
+
+import tornado_opensearch.api_requestor as api_requestor
+import tornado_opensearch.recorder as recorder
+
+
+class TrafficRecorderTests(AsyncTestCase):
+    maxDiff = 1000
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "traffic.jsonl")
+
+        super().setUp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+        super().tearDown()
+
+    @gen_test
+    def test_record(self):
+        """ 测试记录请求，不含签名及 body 内容"""
+        with mock.patch("tornado_opensearch.api_requestor.AsyncHTTPClient", autospec=True) as M:
+            fut = Future()
+            fut.set_result(mock.Mock(
+                code=200, request_time=0.1, effective_url="",
+                body='{"status": "OK"}'.encode("utf8")
+            ))
+            M.return_value.fetch.return_value = fut
+
+            rec = recorder.TrafficRecorder(self.path)
+            requestor = api_requestor.APIRequestor(
+                api_baseurl="http://example.com",
+                api_key="testkey",
+                api_secret="testsecret",
+                api_version="v2",
+                recorder=rec
+            )
+            yield requestor.request_raw("GET", "/search", {"query": "q"})
+            yield requestor.request_raw(
+                "POST", "/index/doc/app",
+                {"action": "push", "Signature": "s"}, "items=%5B%5D"
+            )
+            rec.close()
+
+        with open(self.path) as f:
+            lines = [json.loads(line) for line in f]
+
+        self.assertEqual(lines[0]["t"], 0)
+        self.assertEqual(lines[0]["params"], {"query": "q"})
+        self.assertEqual(lines[1]["method"], "POST")
+        self.assertEqual(lines[1]["params"], {"action": "push"})
+        self.assertEqual(lines[1]["body_size"], 12)
+        self.assertNotIn("testsecret", json.dumps(lines))
+        self.assertNotIn("testkey", json.dumps(lines))
+
+    def test_flush(self):
+        """ 测试每条记录写入后立即可见"""
+        rec = recorder.TrafficRecorder(self.path)
+        rec.record("GET", "/search", {"query": "q"})
+
+        with open(self.path) as f:
+            lines = [json.loads(line) for line in f]
+        rec.close()
+
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(lines[0]["endpoint"], "/search")
@@ -0,0 +1,137 @@
+# coding: utf-8
+import os
+import tempfile
+from unittest import TestCase
+
+from tornado import gen
+from tornado.gen import coroutine
+from tornado.web import Application, RequestHandler
+from tornado.testing import AsyncHTTPTestCase, gen_test
+
+import tornado_opensearch.replay as replay
+
+
+class PercentileTests(TestCase):
+
+    def test_percentile(self):
+        values = [0.1 * i for i in range(1, 11)]
+        self.assertAlmostEqual(replay.percentile(values, 50), 0.5)
+        self.assertAlmostEqual(replay.percentile(values, 90), 0.9)
+        self.assertAlmostEqual(replay.percentile(values, 100), 1.0)
+        self.assertEqual(replay.percentile([], 50), 0.0)
+
+
+class LoadTests(TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def _write(self, data):
+        with open(self.path, "w") as f:
+            f.write(data)
+
+    def test_load(self):
+        self._write('{"t": 0}\n\n{"t": 1}\n')
+        self.assertEqual(replay.load(self.path), [{"t": 0}, {"t": 1}])
+
+    def test_load_truncated(self):
+        """ 测试跳过不完整的最后一行"""
+        self._write('{"t": 0}\n{"t": 1}\n{"t": 2, "met')
+        self.assertEqual(replay.load(self.path), [{"t": 0}, {"t": 1}])
+
+    def test_load_corrupt(self):
+        """ 测试中间的行损坏时报错"""
+        self._write('{"t": 0}\n{"t": 1, "met\n{"t": 2}\n')
+        with self.assertRaises(ValueError):
+            replay.load(self.path)
+
+
+class StubHandler(RequestHandler):
+    """ 模拟 OpenSearch 的接口"""
+    requests = []
+
+    def get(self, path):
+        self.requests.append(("GET", path, self.get_argument("query", None)))
+        self.write({"status": "OK"})
+
+    def post(self, path):
+        self.requests.append(("POST", path, self.request.body))
+        self.write({"status": "OK"})
+
+
+class SlowHandler(RequestHandler):
+    """ 记录同时处理的请求数"""
+    active = 0
+    max_active = 0
+
+    @coroutine
+    def get(self):
+        cls = type(self)
+        cls.active += 1
+        cls.max_active = max(cls.max_active, cls.active)
+        yield gen.sleep(0.05)
+        cls.active -= 1
+        self.write({"status": "OK"})
+
+
+class ReplayTests(AsyncHTTPTestCase):
+    maxDiff = 1000
+
+    def get_app(self):
+        StubHandler.requests = []
+        SlowHandler.active = SlowHandler.max_active = 0
+        return Application([
+            (r"/(search|index/doc/.*)", StubHandler),
+            (r"/slow", SlowHandler),
+        ])
+
+    @gen_test
+    def test_replay(self):
+        """ 测试回放并统计结果"""
+        descriptors = [
+            {"t": 0.0, "method": "GET", "endpoint": "/search",
+             "params": {"query": "q"}, "body_size": 0},
+            {"t": 0.01, "method": "POST", "endpoint": "/index/doc/app",
+             "params": {"action": "push"}, "body_size": 5},
+            {"t": 0.02, "method": "GET", "endpoint": "/missing",
+             "params": {}, "body_size": 0},
+            {"t": 0.02, "method": "DELETE", "endpoint": "/index",
+             "params": {}, "body_size": 0},
+        ]
+
+        report = yield replay.replay(
+            descriptors, self.get_url(""),
+            speed=2, concurrency=2, client=self.http_client
+        )
+
+        self.assertEqual(StubHandler.requests, [
+            ("GET", "search", "q"),
+            ("POST", "index/doc/app", b"xxxxx"),
+        ])
+        self.assertEqual(report["requests"], 4)
+        self.assertEqual(report["errors"], 2)
+        self.assertEqual(report["error_types"], {
+            "HTTP 404": 1,
+            "APIError": 1,
+        })
+        self.assertGreaterEqual(report["elapsed"], 0.01)
+        self.assertIn("APIError: 1", replay.format_report(report))
+
+    @gen_test
+    def test_replay_concurrency(self):
+        """ 测试未指定 client 时并发数不受默认连接数限制"""
+        descriptors = [
+            {"t": 0.0, "method": "GET", "endpoint": "/slow",
+             "params": {}, "body_size": 0}
+        ] * 20
+
+        report = yield replay.replay(
+            descriptors, self.get_url(""), speed=0, concurrency=20
+        )
+
+        self.assertEqual(report["errors"], 0)
+        self.assertEqual(SlowHandler.max_active, 20)
@@ -0,0 +1,78 @@
+# coding: utf-8
+import time
+import socket
+
+from tornado import gen
+from tornado.gen import coroutine
+from tornado.testing import AsyncTestCase, gen_test
+
+import tornado_opensearch.resolver as resolver
+
+
+class DummyResolver(object):
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+
+    @coroutine
+    def resolve(self, host, port, family=socket.AF_UNSPEC):
+        self.calls += 1
+        if self.fail:
+            raise IOError("fail")
+        return [(socket.AF_INET, ("127.0.0.%d" % self.calls, port))]
+
+    def close(self):
+        pass
+
+
+class CachingResolverTests(AsyncTestCase):
+    maxDiff = 1000
+
+    def setUp(self):
+        self.dummy = DummyResolver()
+        self.resolver = resolver.CachingResolver(
+            resolver=self.dummy, ttl=100, refresh=0.8
+        )
+
+        super().setUp()
+
+    def _age(self, seconds):
+        key = ("example.com", 80, socket.AF_UNSPEC)
+        addrinfo, _ = self.resolver._cache[key]
+        self.resolver._cache[key] = (addrinfo, time.time() - seconds)
+
+    @gen_test
+    def test_cache(self):
+        """ 测试缓存命中"""
+        first = yield self.resolver.resolve("example.com", 80)
+        second = yield self.resolver.resolve("example.com", 80)
+        self.assertEqual(first, second)
+        self.assertEqual(self.dummy.calls, 1)
+        self.assertEqual(self.resolver.stats()["hits"], 1)
+
+    @gen_test
+    def test_refresh(self):
+        """ 测试接近过期时后台刷新"""
+        yield self.resolver.resolve("example.com", 80)
+        self._age(90)
+
+        result = yield self.resolver.resolve("example.com", 80)
+        self.assertEqual(result[0][1][0], "127.0.0.1")
+
+        yield gen.moment
+        self.assertEqual(self.dummy.calls, 2)
+        result = yield self.resolver.resolve("example.com", 80)
+        self.assertEqual(result[0][1][0], "127.0.0.2")
+
+    @gen_test
+    def test_stale(self):
+        """ 测试过期后解析失败时使用旧结果"""
+        yield self.resolver.resolve("example.com", 80)
+        self._age(200)
+        self.dummy.fail = True
+
+        result = yield self.resolver.resolve("example.com", 80)
+        self.assertEqual(result[0][1][0], "127.0.0.1")
+
+        with self.assertRaises(IOError):
+            yield self.resolver.resolve("example.org", 80)
@@ -1,10 +1,15 @@
 # coding: utf-8
+import socket
+import unittest
 from unittest import mock
 
 from tornado.gen import coroutine
-from tornado.testing import AsyncTestCase, gen_test
+from tornado.web import Application, RequestHandler
+from tornado.httpclient import AsyncHTTPClient
+from tornado.testing import AsyncTestCase, AsyncHTTPTestCase, gen_test
 
 import tornado_opensearch.resource as resource
+import tornado_opensearch.resolver as resolver
 
 
 class DummyAPIRequestor(mock.MagicMock):
@@ -74,3 +79,90 @@ class OpenSearchTests(AsyncTestCase):
             },
             "query": "keyword:'test'",
         }, "config=hit:2,start:1&&query=keyword:'test'")
+
+
+class StubHandler(RequestHandler):
+    methods = []
+
+    def head(self):
+        self.methods.append("HEAD")
+
+    def get(self):
+        self.methods.append("GET")
+        self.write({"status": "OK"})
+
+
+class StubResolver(object):
+    """ 把任意域名解析到 127.0.0.1"""
+
+    def __init__(self):
+        self.calls = 0
+
+    @coroutine
+    def resolve(self, host, port, family=socket.AF_UNSPEC):
+        self.calls += 1
+        return [(socket.AF_INET, ("127.0.0.1", port))]
+
+    def close(self):
+        pass
+
+
+class WarmupTests(AsyncHTTPTestCase):
+    maxDiff = 1000
+
+    def get_app(self):
+        StubHandler.methods = []
+        return Application([(r"/.*", StubHandler)])
+
+    def _make_one(self, **kwargs):
+        # 域名只能由 resolver 解析，用来确认请求确实使用了 resolver
+        return resource.OpenSearch(
+            api_baseurl="http://opensearch.test:%d/" % self.get_http_port(),
+            api_key="testkey",
+            api_secret="testsecret",
+            **kwargs
+        )
+
+    @unittest.skipIf(resolver.curl_client_class() is None, "需要 pycurl")
+    @gen_test
+    def test_warmup_curl(self):
+        """ 测试使用 curl 预热连接，请求通过 CURLOPT_RESOLVE 使用缓存的解析结果"""
+        stub = StubResolver()
+        api = self._make_one(
+            resolver=resolver.CachingResolver(resolver=stub)
+        )
+        self.assertTrue(resolver.is_curl_client(api.get_client()))
+
+        yield api.warmup(connections=2)
+        self.assertEqual(StubHandler.methods, ["HEAD", "HEAD"])
+        self.assertIsNotNone(api.stats()["warmup_time"])
+        self.assertIsNone(api.stats()["first_fast_request_time"])
+
+        result = yield api.search(query="")
+        self.assertEqual(result["status"], "OK")
+        self.assertEqual(stub.calls, 1)
+        self.assertIsNotNone(api.stats()["first_fast_request_time"])
+
+        api.get_client().close()
+
+    @gen_test
+    def test_warmup_simple(self):
+        """ 测试 SimpleAsyncHTTPClient 不建立连接，并记录警告"""
+        client = AsyncHTTPClient(force_instance=True)
+        api = self._make_one(client=client)
+
+        with mock.patch.object(resource.logger, "warning") as warning:
+            yield api.warmup(connections=2)
+
+        self.assertTrue(warning.called)
+        self.assertEqual(StubHandler.methods, [])
+        client.close()
+
+    def test_client_ignores_resolver(self):
+        """ 测试指定的 client 不使用 resolver 时记录警告"""
+        client = AsyncHTTPClient(force_instance=True)
+        with mock.patch.object(resource.logger, "warning") as warning:
+            self._make_one(client=client, resolver=StubResolver())
+
+        self.assertTrue(warning.called)
+        client.close()
@@ -0,0 +1,78 @@
+# coding: utf-8
+from tornado import gen
+from tornado.testing import AsyncTestCase, gen_test
+
+import tornado_opensearch.scheduler as scheduler
+import tornado_opensearch.error as error
+
+
+class PrioritySchedulerTests(AsyncTestCase):
+    maxDiff = 1000
+
+    def _make_one(self, **kwargs):
+        return scheduler.PriorityScheduler(**kwargs)
+
+    def test_priority_for(self):
+        """ 测试按 endpoint 取默认优先级"""
+        s = self._make_one()
+        self.assertEqual(
+            s.priority_for("/search"), scheduler.PRIORITY_INTERACTIVE
+        )
+        self.assertEqual(
+            s.priority_for("/index/error/app"), scheduler.PRIORITY_NORMAL
+        )
+        self.assertEqual(
+            s.priority_for("/index/doc/app"), scheduler.PRIORITY_BACKGROUND
+        )
+        self.assertEqual(
+            s.priority_for("/index/doc/app", scheduler.PRIORITY_INTERACTIVE),
+            scheduler.PRIORITY_INTERACTIVE
+        )
+
+        with self.assertRaises(error.APIError):
+            s.priority_for("/search", 99)
+
+    @gen_test
+    def test_reserved(self):
+        """ 测试为最高优先级保留的名额"""
+        s = self._make_one(max_concurrency=2, reserved=1)
+
+        yield s.acquire(scheduler.PRIORITY_BACKGROUND)
+        background = s.acquire(scheduler.PRIORITY_BACKGROUND)
+        self.assertFalse(background.done())
+
+        yield s.acquire(scheduler.PRIORITY_INTERACTIVE)
+        self.assertEqual(s.in_flight, 2)
+
+        s.release()
+        self.assertFalse(background.done())
+        s.release()
+        yield background
+
+        stats = s.stats()
+        self.assertEqual(stats[scheduler.PRIORITY_BACKGROUND]["dispatched"], 2)
+        self.assertEqual(stats[scheduler.PRIORITY_BACKGROUND]["queued"], 0)
+
+    @gen_test
+    def test_weighted(self):
+        """ 测试按权重公平出队"""
+        s = self._make_one(max_concurrency=1, reserved=0,
+                           weights={0: 3, 1: 1})
+
+        yield s.acquire(0)
+        pending = [
+            (priority, s.acquire(priority))
+            for priority in (1, 1, 1, 0, 0, 0, 0)
+        ]
+
+        order = []
+        for _ in range(7):
+            s.release()
+            yield gen.moment
+            for item in pending:
+                if item[1].done():
+                    order.append(item[0])
+                    pending.remove(item)
+                    break
+
+        self.assertEqual(order, [0, 0, 1, 0, 0, 1, 1])
@@ -0,0 +1,168 @@
+# coding: utf-8
+from unittest import mock, TestCase
+
+from tornado.gen import coroutine
+from tornado.testing import AsyncTestCase, gen_test
+
+import tornado_opensearch.tail as tail
+import tornado_opensearch.error as error
+
+
+class DummyOpenSearch(object):
+    app_name = "testapp"
+
+    def __init__(self, entries):
+        # 按时间倒序
+        self.entries = entries
+        self.pages = []
+
+    @coroutine
+    def get_error_log(self, page=1, page_size=20,
+                      sort_mode="DESC", app_name=None):
+        self.pages.append(page)
+        start = (page - 1) * page_size
+        return {
+            "status": "OK",
+            "result": self.entries[start:start + page_size],
+        }
+
+
+def _entry(created, message):
+    return {"created": created, "message": message}
+
+
+class ErrorLogCursorTests(TestCase):
+
+    def test_dumps_loads(self):
+        cursor = tail.ErrorLogCursor()
+        cursor.advance("app", [_entry(1, "a"), _entry(2, "b"), _entry(2, "c")])
+
+        restored = tail.ErrorLogCursor.loads(cursor.dumps())
+        timestamp, ids = restored.get("app")
+        self.assertEqual(timestamp, 2)
+        self.assertEqual(len(ids), 2)
+        self.assertTrue(restored.is_known("app", _entry(2, "b")))
+        self.assertTrue(restored.is_known("app", _entry(1, "x")))
+        self.assertFalse(restored.is_known("app", _entry(2, "d")))
+        self.assertFalse(restored.is_known("other", _entry(1, "a")))
+
+
+class ErrorLogTailerTests(AsyncTestCase):
+
+    @gen_test
+    def test_poll(self):
+        """ 测试增量拉取，遇到已知条目即停止"""
+        api = DummyOpenSearch([_entry(i, "e%d" % i) for i in range(5, 0, -1)])
+        tailer = tail.ErrorLogTailer(api, page_size=2)
+
+        # 游标为空时只取最新一页，不下载全部历史
+        entries = yield tailer.poll()
+        self.assertEqual([e["created"] for e in entries], [4, 5])
+        self.assertEqual(api.pages, [1])
+
+        api.pages = []
+        api.entries = [_entry(7, "e7"), _entry(6, "e6")] + api.entries
+        entries = yield tailer.poll()
+        self.assertEqual([e["created"] for e in entries], [6, 7])
+        self.assertEqual(api.pages, [1, 2])
+
+        api.pages = []
+        entries = yield tailer.poll()
+        self.assertEqual(entries, [])
+        self.assertEqual(api.pages, [1])
+
+    @gen_test
+    def test_poll_backlog(self):
+        """ 测试新条目超过多页时不丢失"""
+        api = DummyOpenSearch([_entry(1, "e1")])
+        tailer = tail.ErrorLogTailer(api, page_size=2)
+        yield tailer.poll()
+
+        api.entries = [_entry(i, "e%d" % i) for i in range(31, 0, -1)]
+        entries = yield tailer.poll()
+        self.assertEqual([e["created"] for e in entries], list(range(2, 32)))
+
+        api.entries.insert(0, _entry(32, "e32"))
+        entries = yield tailer.poll()
+        self.assertEqual([e["created"] for e in entries], [32])
+
+    @gen_test
+    def test_poll_max_pages(self):
+        """ 测试超过 max_pages 时记录警告"""
+        api = DummyOpenSearch([_entry(1, "e1")])
+        tailer = tail.ErrorLogTailer(api, page_size=2, max_pages=2)
+        yield tailer.poll()
+
+        api.entries = [_entry(i, "e%d" % i) for i in range(10, 0, -1)]
+        with mock.patch.object(tail.logger, "warning") as warning:
+            entries = yield tailer.poll()
+        self.assertEqual(len(entries), 4)
+        self.assertTrue(warning.called)
+
+    @gen_test
+    def test_poll_shifted_pages(self):
+        """ 测试翻页期间写入新错误时去重"""
+        api = DummyOpenSearch([_entry(i, "e%d" % i) for i in range(4, 0, -1)])
+        get_error_log = api.get_error_log
+
+        @coroutine
+        def shifting(page=1, **kwargs):
+            if page == 2:
+                api.entries.insert(0, _entry(5, "e5"))
+            result = yield get_error_log(page=page, **kwargs)
+            return result
+
+        api.get_error_log = shifting
+        tailer = tail.ErrorLogTailer(api, page_size=2, initial_pages=None)
+
+        entries = yield tailer.poll()
+        self.assertEqual([e["created"] for e in entries], [1, 2, 3, 4])
+
+    @gen_test
+    def test_interval(self):
+        """ 测试轮询间隔自适应"""
+        api = DummyOpenSearch([])
+        tailer = tail.ErrorLogTailer(api, min_interval=1, max_interval=4)
+
+        for _ in range(3):
+            yield tailer.poll()
+        self.assertEqual(tailer.interval, 4)
+
+        api.entries = [_entry(1, "a")]
+        yield tailer.poll()
+        self.assertEqual(tailer.interval, 2)
+
+    @gen_test
+    def test_async_iteration(self):
+        """ 测试异步迭代"""
+        api = DummyOpenSearch([_entry(2, "b"), _entry(1, "a")])
+        tailer = tail.ErrorLogTailer(api, min_interval=0.01)
+
+        first = yield tailer.__anext__()
+        second = yield tailer.__anext__()
+        self.assertEqual([first["message"], second["message"]], ["a", "b"])
+
+        tailer.close()
+        with self.assertRaises(StopAsyncIteration):
+            yield tailer.__anext__()
+
+    @gen_test
+    def test_iteration_error(self):
+        """ 测试请求失败时继续迭代并延长间隔"""
+        api = DummyOpenSearch([_entry(1, "a")])
+        get_error_log = api.get_error_log
+        failures = [error.APIError("fail")]
+
+        @coroutine
+        def flaky(**kwargs):
+            if failures:
+                raise failures.pop()
+            result = yield get_error_log(**kwargs)
+            return result
+
+        api.get_error_log = flaky
+        tailer = tail.ErrorLogTailer(api, min_interval=0.01)
+
+        entry = yield tailer.__anext__()
+        self.assertEqual(entry["message"], "a")
+        self.assertEqual(tailer.interval, 0.01)